@@ -26,11 +26,43 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = os.getenv("DJANGO_SECRET_KEY")
 IPSTACK_API_KEY = os.getenv("IPSTACK_API_KEY")
 
+# Geolocation providers, in order of preference. Each provider after the
+# first is hedged: it is fired when the previous one has not answered
+# within its p95 latency.
+GEOLOCATION_PROVIDERS = [
+    {
+        "BACKEND": "geolocation.providers.IPStackProvider",
+        "OPTIONS": {
+            "p95_latency": float(os.getenv("IPSTACK_P95_LATENCY", "1.0")),
+            # Defaults to the public API; override to point at e.g.
+            # `manage.py fake_ipstack` for load tests.
+            "url_template": os.getenv("IPSTACK_URL_TEMPLATE"),
+        },
+    },
+]
+if os.getenv("GEOLOCATION_DATASET_PATH"):
+    GEOLOCATION_PROVIDERS.append(
+        {
+            "BACKEND": "geolocation.providers.LocalDatasetProvider",
+            "OPTIONS": {"path": os.getenv("GEOLOCATION_DATASET_PATH")},
+        }
+    )
+# Hedged requests are capped at this fraction of resolved queries.
+GEOLOCATION_MAX_HEDGE_RATIO = 0.05
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG", "False") == "True"
 
 ALLOWED_HOSTS = ["0.0.0.0", "localhost"]
 
+# Opt-in per-request profiling of the geolocation API. Requests carrying an
+# X-Geolocation-Profile header signed with SECRET_KEY (see
+# `manage.py profile_token`) are profiled and the report is cached.
+GEOLOCATION_PROFILING_TOKEN_MAX_AGE = 15 * 60
+GEOLOCATION_PROFILING_INTERVAL = 0.001
+GEOLOCATION_PROFILING_REPORT_TTL = 60 * 60
+GEOLOCATION_PROFILING_CACHE = "geolocation-profiling"
+
 
 # Application definition
 
@@ -103,6 +135,22 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Profiling reports are fetched in a later request that may land on
+    # another worker, so they are kept in the database.
+    "geolocation-profiling": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "geolocation_profiling_cache",
+    },
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
 
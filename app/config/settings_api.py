@@ -0,0 +1,38 @@
+"""
+Lean production profile for the geolocation JSON API.
+
+Drops admin, sessions, messages, CSRF and auth from the app set and the
+middleware chain; the API does not use any of them. Select it with
+DJANGO_SETTINGS_MODULE=config.settings_api.
+"""
+
+from .settings import *  # noqa: F401, F403
+from .settings import DATABASES
+
+INSTALLED_APPS = [
+    "rest_framework",
+    "geolocation",
+]
+
+MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.middleware.common.CommonMiddleware",
+]
+
+ROOT_URLCONF = "config.urls_api"
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
+    "DEFAULT_PERMISSION_CLASSES": [],
+    "UNAUTHENTICATED_USER": None,
+    "DEFAULT_RENDERER_CLASSES": ["rest_framework.renderers.JSONRenderer"],
+}
+
+# Reuse database connections across requests instead of reconnecting
+# on every request.
+DATABASES["default"]["CONN_MAX_AGE"] = 60
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
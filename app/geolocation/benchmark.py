@@ -0,0 +1,292 @@
+import copy
+import ipaddress
+import json
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+
+from .models import Geolocation
+from .providers import IPStackProvider, get_resolver
+
+DEFAULT_PAYLOAD = {
+    "country_name": "Poland",
+    "region_name": "Mazovia",
+    "city": "Warsaw",
+    "latitude": 52.2297,
+    "longitude": 21.0122,
+}
+PERCENTILES = (50, 90, 95, 99)
+# Seeded rows use 10.0.0.0/8, posted addresses 172.16.0.0/12.
+SEED_NETWORK = int(ipaddress.IPv4Address("10.0.0.0"))
+POST_NETWORK = int(ipaddress.IPv4Address("172.16.0.0"))
+
+
+class FakeIPStackServer:
+    """
+    Local stand-in for the IPStack API with configurable latency,
+    error rate and payload. A slow_rate fraction of responses take
+    slow_latency instead, to model a latency tail. Runs in a background
+    thread.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        payload: Optional[dict] = None,
+        seed: int = 0,
+        slow_rate: float = 0.0,
+        slow_latency: float = 0.0,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.payload = payload or DEFAULT_PAYLOAD
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url_template(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{{query}}?access_key={{api_key}}"
+
+    def _draw(self) -> float:
+        with self._random_lock:
+            return self._random.random()
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                latency = server.latency
+                if server._draw() < server.slow_rate:
+                    latency = server.slow_latency
+                if latency:
+                    time.sleep(latency)
+                if server._draw() < server.error_rate:
+                    status, body = 500, {"error": "Internal Server Error"}
+                else:
+                    status, body = 200, server.payload
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format: str, *args: tuple) -> None:
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeIPStackServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        if self._thread:
+            self._server.shutdown()
+            self._thread.join()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeIPStackServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: tuple) -> None:
+        self.stop()
+
+
+def seed_ip(index: int) -> str:
+    return str(ipaddress.IPv4Address(SEED_NETWORK + index))
+
+
+def _seed_row(ip: str) -> Geolocation:
+    return Geolocation(
+        ip_address=ip,
+        country="Poland",
+        region="Mazovia",
+        city="Warsaw",
+        latitude=52.2297,
+        longitude=21.0122,
+    )
+
+
+def seed_geolocations(rows: int, batch_size: int = 10_000) -> int:
+    """
+    Bulk insert seeded rows until the table holds at least `rows` of them.
+    Returns the number of rows inserted.
+    """
+    existing = Geolocation.objects.count()
+    for start in range(existing, rows, batch_size):
+        Geolocation.objects.bulk_create(
+            _seed_row(seed_ip(index))
+            for index in range(start, min(start + batch_size, rows))
+        )
+    return max(rows - existing, 0)
+
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def summarize(latencies: list, queries: list, statuses: list, wall: float) -> dict:
+    summary = {
+        "requests": len(latencies),
+        "errors": sum(1 for code in statuses if code >= 500),
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "queries_per_request": sum(queries) / len(queries),
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(latencies, pct) * 1000
+    return summary
+
+
+def _drive(method: str, paths: list, concurrency: int) -> dict:
+    def call(path: str) -> tuple:
+        client = Client()
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            if method == "post":
+                response = client.post(
+                    "/api/geolocation/",
+                    {"ip": path},
+                    content_type="application/json",
+                )
+            else:
+                response = getattr(client, method)(path)
+            elapsed = time.perf_counter() - started
+        return elapsed, len(ctx.captured_queries), response.status_code
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(call, paths))
+    else:
+        results = [call(path) for path in paths]
+    wall = time.perf_counter() - started
+
+    latencies, queries, statuses = zip(*results)
+    return summarize(list(latencies), list(queries), list(statuses), wall)
+
+
+def run_benchmark(
+    url_template: str,
+    rows: int,
+    requests: int,
+    concurrency: int = 1,
+    seed: int = 0,
+    secondary_url_template: Optional[str] = None,
+) -> dict:
+    """
+    Drive GET, POST and DELETE against GeolocationView in process, with the
+    configured providers. IPStack providers are pointed at `url_template`;
+    `secondary_url_template` adds one more IPStack provider as a hedge
+    target. Expects `rows` seeded rows.
+    """
+    rng = random.Random(seed)
+    get_paths = [
+        f"/api/geolocation/?ip={seed_ip(rng.randrange(rows))}"
+        for _ in range(requests)
+    ]
+    post_ips = [
+        str(ipaddress.IPv4Address(POST_NETWORK + index))
+        for index in range(requests)
+    ]
+    delete_indexes = rng.sample(range(rows), min(requests, rows))
+    delete_paths = [
+        f"/api/geolocation/?ip={seed_ip(index)}" for index in delete_indexes
+    ]
+
+    providers = copy.deepcopy(settings.GEOLOCATION_PROVIDERS)
+    for config in providers:
+        if issubclass(import_string(config["BACKEND"]), IPStackProvider):
+            config.setdefault("OPTIONS", {})["url_template"] = url_template
+    if secondary_url_template:
+        providers.append(
+            {
+                "BACKEND": "geolocation.providers.IPStackProvider",
+                "OPTIONS": {
+                    "name": "IPStack secondary",
+                    "url_template": secondary_url_template,
+                },
+            }
+        )
+    with override_settings(
+        ALLOWED_HOSTS=["testserver"],
+        IPSTACK_API_KEY="benchmark",
+        GEOLOCATION_PROVIDERS=providers,
+    ):
+        get_resolver.cache_clear()
+        try:
+            results = {
+                "get": _drive("get", get_paths, concurrency),
+                "post": _drive("post", post_ips, concurrency),
+                "delete": _drive("delete", delete_paths, concurrency),
+            }
+        finally:
+            get_resolver.cache_clear()
+            _restore(post_ips, delete_indexes)
+    return results
+
+
+def _restore(post_ips: list, delete_indexes: list) -> None:
+    """
+    Undo the writes of a run so a kept database can be reused as is.
+    """
+    Geolocation.objects.filter(ip_address__in=post_ips).delete()
+    deleted = [seed_ip(index) for index in delete_indexes]
+    Geolocation.objects.filter(ip_address__in=deleted).delete()
+    Geolocation.objects.bulk_create(
+        _seed_row(ip) for ip in deleted
+    )
+
+
+def compare_to_baseline(
+    results: dict, baseline: dict, tolerance: float
+) -> list:
+    """
+    Return a description of every metric that regressed by more than
+    `tolerance` (a fraction) against the baseline.
+    """
+    regressions = []
+    for operation, current in results.items():
+        previous = baseline.get(operation)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "p99_ms", "queries_per_request"):
+            if current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{operation} {metric}: "
+                    f"{previous[metric]:.2f} -> {current[metric]:.2f}"
+                )
+        if current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{operation} throughput: "
+                f"{previous['throughput']:.2f} -> {current['throughput']:.2f}"
+            )
+    return regressions
@@ -0,0 +1,178 @@
+import json
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+
+from geolocation.benchmark import (
+    PERCENTILES,
+    FakeIPStackServer,
+    compare_to_baseline,
+    run_benchmark,
+    seed_geolocations,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark GET/POST/DELETE on the geolocation API against a seeded "
+        "test database and a local fake IPStack server."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Fake IPStack latency in seconds.",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of fake IPStack responses that fail with 500.",
+        )
+        parser.add_argument(
+            "--payload", help="JSON file with the fake IPStack response body."
+        )
+        parser.add_argument(
+            "--slow-rate",
+            type=float,
+            default=0.0,
+            help="Fraction of fake IPStack responses that take --slow-latency.",
+        )
+        parser.add_argument(
+            "--slow-latency",
+            type=float,
+            default=1.0,
+            help="Latency of slow fake IPStack responses in seconds.",
+        )
+        parser.add_argument(
+            "--secondary-latency",
+            type=float,
+            help=(
+                "Add a second fake IPStack server with this latency as a "
+                "hedge target after the configured providers."
+            ),
+        )
+        parser.add_argument(
+            "--baseline",
+            default="benchmark_baseline.json",
+            help="Baseline file to compare against.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results as the new baseline.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed regression against the baseline, as a fraction.",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the seeded test database between runs.",
+        )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        for name in ("rows", "requests", "concurrency"):
+            if options[name] < 1:
+                raise CommandError(f"--{name} must be a positive integer.")
+        for name in ("error_rate", "slow_rate"):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(
+                    f"--{name.replace('_', '-')} must be between 0 and 1."
+                )
+
+        payload = None
+        if options["payload"]:
+            payload = json.loads(Path(options["payload"]).read_text())
+
+        # Never touch the real database: run against the test database,
+        # like the test runner does.
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options["keepdb"]
+        )
+        try:
+            inserted = seed_geolocations(options["rows"])
+            self.stdout.write(f"Seeded {inserted} rows.")
+            with ExitStack() as stack:
+                server = stack.enter_context(
+                    FakeIPStackServer(
+                        latency=options["latency"],
+                        error_rate=options["error_rate"],
+                        payload=payload,
+                        seed=options["seed"],
+                        slow_rate=options["slow_rate"],
+                        slow_latency=options["slow_latency"],
+                    )
+                )
+                secondary_url_template = None
+                if options["secondary_latency"] is not None:
+                    secondary = stack.enter_context(
+                        FakeIPStackServer(
+                            latency=options["secondary_latency"],
+                            payload=payload,
+                            seed=options["seed"] + 1,
+                        )
+                    )
+                    secondary_url_template = secondary.url_template
+                results = run_benchmark(
+                    server.url_template,
+                    rows=options["rows"],
+                    requests=options["requests"],
+                    concurrency=options["concurrency"],
+                    seed=options["seed"],
+                    secondary_url_template=secondary_url_template,
+                )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options["keepdb"]
+            )
+
+        self._report(results)
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(f"Baseline saved to {baseline_path}.")
+            return
+        if not baseline_path.exists():
+            return
+
+        regressions = compare_to_baseline(
+            results,
+            json.loads(baseline_path.read_text()),
+            options["tolerance"],
+        )
+        if regressions:
+            raise CommandError(
+                "Performance regressions:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def _report(self, results: dict) -> None:
+        percentiles = "".join(f"{f'p{pct}':>7}" for pct in PERCENTILES)
+        self.stdout.write(
+            f"{'op':<8}{'req/s':>10}{'mean':>9}{percentiles}"
+            f"{'queries':>9}{'errors':>8}"
+        )
+        for operation, summary in results.items():
+            latencies = "".join(
+                f"{summary[f'p{pct}_ms']:>7.2f}" for pct in PERCENTILES
+            )
+            self.stdout.write(
+                f"{operation:<8}{summary['throughput']:>10.1f}"
+                f"{summary['mean_ms']:>9.2f}{latencies}"
+                f"{summary['queries_per_request']:>9.1f}"
+                f"{summary['errors']:>8}"
+            )
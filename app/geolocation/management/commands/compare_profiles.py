@@ -0,0 +1,78 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+# Runs in a fresh interpreter per settings module. The request fails input
+# validation, so it measures the middleware and view stack without the
+# database or the provider.
+PROBE = """
+import json, sys, time
+from django.core.wsgi import get_wsgi_application
+from django.test import Client
+
+application = get_wsgi_application()
+client = Client(HTTP_HOST="localhost")
+path, data = "/api/geolocation/", {"ip": "invalid"}
+client.get(path, data)
+first_response = time.time()
+
+requests = int(sys.argv[1])
+started = time.perf_counter()
+for _ in range(requests):
+    client.get(path, data)
+per_request = (time.perf_counter() - started) / requests
+print(json.dumps({"first_response": first_response, "per_request": per_request}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare cold start and per-request overhead of settings profiles, "
+        "each measured in fresh interpreters."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "profiles",
+            nargs="*",
+            default=["config.settings", "config.settings_api"],
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--requests", type=int, default=500)
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        self.stdout.write(
+            f"{'profile':<24}{'cold start ms':>15}{'per request us':>16}"
+        )
+        for profile in options["profiles"]:
+            cold_starts, per_request = [], []
+            for _ in range(options["runs"]):
+                result = self._probe(profile, options["requests"])
+                cold_starts.append(result["cold_start"])
+                per_request.append(result["per_request"])
+            self.stdout.write(
+                f"{profile:<24}"
+                f"{statistics.median(cold_starts) * 1000:>15.1f}"
+                f"{statistics.median(per_request) * 1e6:>16.1f}"
+            )
+
+    def _probe(self, profile: str, requests: int) -> dict:
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": profile}
+        started = time.time()
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, str(requests)],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        result["cold_start"] = result["first_response"] - started
+        return result
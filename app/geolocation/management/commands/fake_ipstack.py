@@ -0,0 +1,46 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from geolocation.benchmark import FakeIPStackServer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve a fake IPStack API for load tests against a running server. "
+        "Point the server at it with the IPSTACK_URL_TEMPLATE env var."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8001)
+        parser.add_argument("--latency", type=float, default=0.05)
+        parser.add_argument("--error-rate", type=float, default=0.0)
+        parser.add_argument("--payload")
+        parser.add_argument("--slow-rate", type=float, default=0.0)
+        parser.add_argument("--slow-latency", type=float, default=1.0)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        payload = None
+        if options["payload"]:
+            payload = json.loads(Path(options["payload"]).read_text())
+
+        server = FakeIPStackServer(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            payload=payload,
+            seed=options["seed"],
+            slow_rate=options["slow_rate"],
+            slow_latency=options["slow_latency"],
+        )
+        self.stdout.write(f"Serving fake IPStack at {server.url_template}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from geolocation.profiling import make_profile_token
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a signed X-Geolocation-Profile header value. Valid for "
+        "GEOLOCATION_PROFILING_TOKEN_MAX_AGE seconds."
+    )
+
+    def handle(self, *args: tuple, **options: dict) -> None:
+        self.stdout.write(make_profile_token())
@@ -0,0 +1,240 @@
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "HTTP_X_GEOLOCATION_PROFILE"
+REPORT_ID_HEADER = "X-Geolocation-Profile-Id"
+CACHE_KEY = "geolocation-profile:{}"
+SIGNING_SALT = "geolocation.profiling"
+
+_upstream_calls: ContextVar[Optional[list]] = ContextVar(
+    "geolocation_upstream_calls", default=None
+)
+
+
+def make_profile_token() -> str:
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign("profile")
+
+
+def is_profiling_authorized(request: HttpRequest) -> bool:
+    """
+    True when the request carries a valid, unexpired signed profiling header.
+    """
+    token = request.META.get(PROFILE_HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(
+            token, max_age=settings.GEOLOCATION_PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def record_upstream_call(
+    provider: str, query: str, seconds: float, error: Optional[str] = None
+) -> None:
+    """
+    Record a provider call on the request being profiled, if any.
+    """
+    calls = _upstream_calls.get()
+    if calls is not None:
+        calls.append(
+            {
+                "provider": provider,
+                "query": query,
+                "duration_ms": seconds * 1000,
+                "error": error,
+            }
+        )
+
+
+class SamplingProfiler:
+    """
+    Samples the call stack of one thread at a fixed interval from a
+    background thread.
+    """
+
+    def __init__(self, thread_id: int, interval: float) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def hot_spots(self, limit: int = 20) -> list:
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return [
+            {"function": function, "self": own[function], "total": count}
+            for function, count in total.most_common(limit)
+        ]
+
+    def call_tree(self, min_fraction: float = 0.01) -> dict:
+        """
+        Merge sampled stacks into a tree, dropping branches that account
+        for less than min_fraction of the samples.
+        """
+        root = {"function": "<root>", "samples": 0, "children": {}}
+        for stack, count in self.stacks.items():
+            node = root
+            node["samples"] += count
+            for function in stack:
+                node = node["children"].setdefault(
+                    function, {"function": function, "samples": 0, "children": {}}
+                )
+                node["samples"] += count
+
+        threshold = root["samples"] * min_fraction
+
+        def prune(node: dict) -> dict:
+            children = sorted(
+                node["children"].values(),
+                key=lambda child: child["samples"],
+                reverse=True,
+            )
+            return {
+                "function": node["function"],
+                "samples": node["samples"],
+                "children": [
+                    prune(child)
+                    for child in children
+                    if child["samples"] >= threshold
+                ],
+            }
+
+        return prune(root)
+
+
+def profile_request(func: callable) -> callable:
+    """
+    Decorator for view dispatch. Requests with a valid signed profiling
+    header are run under the sampling profiler with SQL and upstream call
+    capture; the report is stored in the profiling cache and its id is
+    returned in the X-Geolocation-Profile-Id response header, which is
+    omitted if the report cannot be stored. Other requests pass straight
+    through.
+    """
+
+    @wraps(func)
+    def wrapper(
+        self: object, request: HttpRequest, *args: tuple, **kwargs: dict
+    ) -> HttpResponse:
+        if not is_profiling_authorized(request):
+            return func(self, request, *args, **kwargs)
+
+        queries = []
+
+        def capture_sql(
+            execute: callable, sql: str, params: tuple, many: bool, context: dict
+        ) -> object:
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append(
+                    {
+                        "sql": sql,
+                        "params": repr(params),
+                        "duration_ms": (time.perf_counter() - started) * 1000,
+                    }
+                )
+
+        upstream = []
+        token = _upstream_calls.set(upstream)
+        profiler = SamplingProfiler(
+            threading.get_ident(), settings.GEOLOCATION_PROFILING_INTERVAL
+        )
+        profiler.start()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(capture_sql):
+                response = func(self, request, *args, **kwargs)
+            # Render inside the profile so serialization is included.
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        finally:
+            duration = time.perf_counter() - started
+            profiler.stop()
+            _upstream_calls.reset(token)
+
+        report_id = uuid.uuid4().hex
+        report = {
+            "id": report_id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status_code": response.status_code,
+            "duration_ms": duration * 1000,
+            "sql": {
+                "count": len(queries),
+                "duration_ms": sum(query["duration_ms"] for query in queries),
+                "queries": queries,
+            },
+            "upstream": list(upstream),
+            "profile": {
+                "interval_ms": profiler.interval * 1000,
+                "samples": sum(profiler.stacks.values()),
+                "hot_spots": profiler.hot_spots(),
+                "call_tree": profiler.call_tree(),
+            },
+        }
+        try:
+            caches[settings.GEOLOCATION_PROFILING_CACHE].set(
+                CACHE_KEY.format(report_id),
+                report,
+                settings.GEOLOCATION_PROFILING_REPORT_TTL,
+            )
+        except Exception:
+            # Profiling is most useful when the database is failing; the
+            # response must not depend on storing the report. Errors
+            # differ per cache backend, hence the broad except.
+            logger.exception("Could not store profiling report %s", report_id)
+            return response
+        response[REPORT_ID_HEADER] = report_id
+        return response
+
+    return wrapper
+
+
+def get_report(report_id: str) -> Optional[dict]:
+    return caches[settings.GEOLOCATION_PROFILING_CACHE].get(
+        CACHE_KEY.format(report_id)
+    )
@@ -0,0 +1,416 @@
+import bisect
+import contextvars
+import csv
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from functools import lru_cache
+from typing import Optional
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .profiling import record_upstream_call
+
+logger = logging.getLogger(__name__)
+
+GEOLOCATION_FIELDS = ("country", "region", "city", "latitude", "longitude")
+
+
+class ProviderError(Exception):
+    """
+    Raised when a provider cannot resolve a query.
+    The payload is returned to the client as the 502 response body.
+    """
+
+    def __init__(self, payload: dict) -> None:
+        super().__init__(payload.get("error", "Provider error"))
+        self.payload = payload
+
+
+class ProviderConfigurationError(ProviderError):
+    """
+    Raised when a provider is misconfigured. Other providers are still
+    tried, but if it is the primary's error the client gets a 500.
+    """
+
+
+class BaseProvider:
+    """
+    Base class for geolocation providers.
+
+    Subclasses implement fetch(), returning the raw provider record.
+    field_map adapts that record onto the Geolocation fields
+    (model field -> provider key).
+    """
+
+    name = "Provider"
+    field_map: dict = {field: field for field in GEOLOCATION_FIELDS}
+    latency_window = 200
+    min_samples = 20
+
+    def __init__(self, p95_latency: float = 1.0, **options: dict) -> None:
+        self.default_p95_latency = p95_latency
+        self._latencies = deque(maxlen=self.latency_window)
+        self._lock = threading.Lock()
+
+    def fetch(self, query: str) -> dict:
+        raise NotImplementedError
+
+    def lookup(self, query: str) -> dict:
+        """
+        Fetch the record for an IP or URL and map it onto Geolocation fields.
+        """
+        started = time.perf_counter()
+        try:
+            result = self.adapt(self.fetch(query))
+        except (ProviderError, OSError, ValueError) as e:
+            # Expected I/O and parse failures (requests errors are OSErrors)
+            # hand over to the next provider; anything else is a bug and
+            # propagates. Details are logged, never returned to the client.
+            error = e
+            if not isinstance(e, ProviderError):
+                logger.warning(
+                    "%s lookup failed for %s", self.name, query, exc_info=True
+                )
+                error = ProviderError({"error": f"{self.name} provider error"})
+            record_upstream_call(
+                self.name,
+                query,
+                time.perf_counter() - started,
+                error.payload["error"],
+            )
+            if error is e:
+                raise
+            raise error from e
+        elapsed = time.perf_counter() - started
+        self.record_latency(elapsed)
+        record_upstream_call(self.name, query, elapsed)
+        return result
+
+    def adapt(self, data: dict) -> dict:
+        if not all(key in data for key in self.field_map.values()):
+            raise ProviderError(
+                {"error": f"Invalid data from {self.name} API"}
+            )
+        return {field: data[key] for field, key in self.field_map.items()}
+
+    def record_latency(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
+
+    @property
+    def p95_latency(self) -> float:
+        """
+        Observed p95 latency of successful lookups, or the configured
+        default until enough samples have been collected.
+        """
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < self.min_samples:
+            return self.default_p95_latency
+        return samples[math.ceil(0.95 * len(samples)) - 1]
+
+
+class HTTPProvider(BaseProvider):
+    """
+    Provider backed by a JSON HTTP API.
+    url_template is formatted with `query` and the provider options.
+    """
+
+    url_template = ""
+
+    def __init__(
+        self,
+        url_template: Optional[str] = None,
+        field_map: Optional[dict] = None,
+        timeout: float = 5,
+        name: Optional[str] = None,
+        **options: dict,
+    ) -> None:
+        super().__init__(**options)
+        self.url_template = url_template or self.url_template
+        self.field_map = field_map or self.field_map
+        self.timeout = timeout
+        self.name = name or self.name
+        self.options = options
+
+    def get_url(self, query: str) -> str:
+        return self.url_template.format(query=query, **self.options)
+
+    def fetch(self, query: str) -> dict:
+        try:
+            response = requests.get(self.get_url(query), timeout=self.timeout)
+        except requests.RequestException as e:
+            # The exception text holds the request URL, API key included.
+            logger.warning("%s API request failed: %s", self.name, type(e).__name__)
+            raise ProviderError({"error": f"{self.name} API unavailable"}) from e
+
+        if response.status_code != 200:
+            raise ProviderError(
+                {
+                    "error": f"{self.name} API error",
+                    "status_code": response.status_code,
+                    "details": response.text,
+                }
+            )
+
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise ProviderError(
+                {"error": f"Invalid JSON response from {self.name} API"}
+            ) from e
+
+        if not isinstance(data, dict):
+            raise ProviderError({"error": f"Invalid data from {self.name} API"})
+        return data
+
+
+class IPStackProvider(HTTPProvider):
+    name = "IPStack"
+    url_template = "https://api.ipstack.com/{query}?access_key={api_key}"
+    field_map = {
+        "country": "country_name",
+        "region": "region_name",
+        "city": "city",
+        "latitude": "latitude",
+        "longitude": "longitude",
+    }
+
+    def __init__(self, api_key: Optional[str] = None, **options: dict) -> None:
+        super().__init__(api_key=api_key or settings.IPSTACK_API_KEY, **options)
+
+    def fetch(self, query: str) -> dict:
+        if not self.options["api_key"]:
+            raise ProviderConfigurationError(
+                {"error": "Missing IPStack API key in settings."}
+            )
+
+        data = super().fetch(query)
+        if not data.get("success", True):
+            error = data.get("error")
+            raise ProviderError(
+                {
+                    "error": "IPStack API returned an error",
+                    "details": (
+                        error.get("info", "Unknown error")
+                        if isinstance(error, dict)
+                        else "Unknown error"
+                    ),
+                }
+            )
+        return data
+
+
+class LocalDatasetProvider(BaseProvider):
+    """
+    Resolves IP addresses from a local CSV dataset.
+    Each row holds a `network` in CIDR notation followed by the
+    Geolocation fields. URLs are not supported.
+
+    The dataset is loaded when the provider is built and indexed as sorted,
+    non-overlapping address ranges per IP version, where nested networks
+    are split so the most specific one wins. Lookups are a binary search.
+    """
+
+    name = "Local dataset"
+
+    def __init__(self, path: str, p95_latency: float = 0.01, **options: dict) -> None:
+        super().__init__(p95_latency=p95_latency, **options)
+        self.path = path
+        self._index = self._load()
+
+    def _load(self) -> dict:
+        networks = {4: [], 6: []}
+        with open(self.path, newline="") as f:
+            for row in csv.DictReader(f):
+                network = ipaddress.ip_network(row.pop("network"), strict=False)
+                row["latitude"] = float(row["latitude"])
+                row["longitude"] = float(row["longitude"])
+                networks[network.version].append(
+                    (
+                        int(network.network_address),
+                        int(network.broadcast_address),
+                        row,
+                    )
+                )
+
+        index = {}
+        for version, ranges in networks.items():
+            segments = self._flatten(ranges)
+            index[version] = (
+                [start for start, _, _ in segments],
+                [end for _, end, _ in segments],
+                [row for _, _, row in segments],
+            )
+        return index
+
+    @staticmethod
+    def _flatten(ranges: list) -> list:
+        """
+        Split nested (start, end, row) ranges into non-overlapping segments,
+        each owned by the most specific range covering it. CIDR networks
+        are either disjoint or nested, never partially overlapping.
+        """
+        segments = []
+        open_ranges = []  # (end, row), innermost last
+        cursor = 0
+        # Outer networks sort before the networks nested in them.
+        for start, end, row in sorted(ranges, key=lambda r: (r[0], -r[1])):
+            while open_ranges and open_ranges[-1][0] < start:
+                closed_end, closed_row = open_ranges.pop()
+                if cursor <= closed_end:
+                    segments.append((cursor, closed_end, closed_row))
+                    cursor = closed_end + 1
+            if open_ranges and cursor < start:
+                segments.append((cursor, start - 1, open_ranges[-1][1]))
+            cursor = start
+            open_ranges.append((end, row))
+        while open_ranges:
+            closed_end, closed_row = open_ranges.pop()
+            if cursor <= closed_end:
+                segments.append((cursor, closed_end, closed_row))
+                cursor = closed_end + 1
+        return segments
+
+    def fetch(self, query: str) -> dict:
+        try:
+            address = ipaddress.ip_address(query)
+        except ValueError as e:
+            raise ProviderError(
+                {"error": f"{self.name} supports IP addresses only"}
+            ) from e
+
+        starts, ends, rows = self._index[address.version]
+        position = bisect.bisect_right(starts, int(address)) - 1
+        if position >= 0 and int(address) <= ends[position]:
+            return rows[position]
+        raise ProviderError({"error": f"No {self.name} entry for {query}"})
+
+
+class HedgedResolver:
+    """
+    Resolves queries through an ordered list of providers.
+
+    The primary provider is called first. If it has not answered within its
+    p95 latency, the next provider is fired as well and whichever returns a
+    result first wins. A failing provider hands over to the next one
+    immediately. When every provider fails, the primary's error is raised.
+
+    Hedges are limited to max_hedge_ratio of the resolved queries (token
+    bucket, bursts of up to hedge_burst). When no hedge can be fired the
+    provider is called inline in the request thread.
+    """
+
+    hedge_burst = 5
+
+    def __init__(self, providers: list, max_hedge_ratio: float = 0.05) -> None:
+        self.providers = providers
+        self.max_hedge_ratio = max_hedge_ratio
+        self._hedge_tokens = 1.0
+        self._lock = threading.Lock()
+
+    def resolve(self, query: str) -> dict:
+        if not self.providers:
+            raise ProviderError({"error": "No geolocation providers configured."})
+
+        with self._lock:
+            self._hedge_tokens = min(
+                self._hedge_tokens + self.max_hedge_ratio, self.hedge_burst
+            )
+
+        pending: dict[Future, int] = {}
+        errors: dict[int, ProviderError] = {}
+        launched = 0
+
+        while pending or launched < len(self.providers):
+            can_hedge = (
+                launched + 1 < len(self.providers) and self._hedge_tokens >= 1
+            )
+            if not pending:
+                if not can_hedge:
+                    # Nothing to race against: stay in the request thread.
+                    try:
+                        return self.providers[launched].lookup(query)
+                    except ProviderError as e:
+                        errors[launched] = e
+                    launched += 1
+                    continue
+                pending[self._start(launched, query)] = launched
+                launched += 1
+
+            hedge_after = None
+            if launched < len(self.providers) and self._hedge_tokens >= 1:
+                hedge_after = self.providers[launched - 1].p95_latency
+
+            done, _ = wait(
+                pending, timeout=hedge_after, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    return future.result()
+                except ProviderError as e:
+                    errors[index] = e
+
+            if not done and self._take_hedge_token():
+                # The latest provider is slower than its p95: hedge.
+                pending[self._start(launched, query)] = launched
+                launched += 1
+
+        raise errors[min(errors)]
+
+    def _take_hedge_token(self) -> bool:
+        with self._lock:
+            if self._hedge_tokens < 1:
+                return False
+            self._hedge_tokens -= 1
+            return True
+
+    def _start(self, index: int, query: str) -> Future:
+        """
+        Run a lookup in its own thread. Losing lookups cannot be cancelled
+        and run until their timeout, so they must not hold a shared pool
+        that later requests queue on.
+        """
+        future = Future()
+        # Run in a copy of the caller's context so profiling of the
+        # request also sees the provider calls.
+        context = contextvars.copy_context()
+        lookup = self.providers[index].lookup
+
+        def run() -> None:
+            try:
+                future.set_result(context.run(lookup, query))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(
+            target=run, name="geolocation-provider", daemon=True
+        ).start()
+        return future
+
+
+@lru_cache(maxsize=None)
+def get_resolver() -> HedgedResolver:
+    """
+    Build the resolver from settings.GEOLOCATION_PROVIDERS, e.g.:
+
+        GEOLOCATION_PROVIDERS = [
+            {"BACKEND": "geolocation.providers.IPStackProvider",
+             "OPTIONS": {"p95_latency": 0.8}},
+        ]
+    """
+    providers = [
+        import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+        for config in settings.GEOLOCATION_PROVIDERS
+    ]
+    return HedgedResolver(
+        providers, max_hedge_ratio=settings.GEOLOCATION_MAX_HEDGE_RATIO
+    )
@@ -0,0 +1,70 @@
+import pytest
+import requests
+from django.core.management import CommandError, call_command
+
+from geolocation.benchmark import (
+    FakeIPStackServer,
+    compare_to_baseline,
+    run_benchmark,
+    seed_geolocations,
+)
+from geolocation.models import Geolocation
+
+
+def test_fake_ipstack_server_error_rate() -> None:
+    with FakeIPStackServer(error_rate=1.0) as server:
+        url = server.url_template.format(query="192.168.1.1", api_key="key")
+        response = requests.get(url, timeout=5)
+
+    assert response.status_code == 500
+
+
+def test_compare_to_baseline_reports_regressions() -> None:
+    baseline = {
+        "get": {"p95_ms": 10, "p99_ms": 20, "queries_per_request": 2, "throughput": 100}
+    }
+    results = {
+        "get": {"p95_ms": 11, "p99_ms": 30, "queries_per_request": 3, "throughput": 95}
+    }
+
+    regressions = compare_to_baseline(results, baseline, tolerance=0.2)
+
+    assert regressions == [
+        "get p99_ms: 20.00 -> 30.00",
+        "get queries_per_request: 2.00 -> 3.00",
+    ]
+
+
+@pytest.mark.django_db
+def test_run_benchmark_leaves_seeded_rows_intact() -> None:
+    seed_geolocations(20)
+
+    with FakeIPStackServer() as server:
+        results = run_benchmark(server.url_template, rows=20, requests=5)
+
+    assert results["get"]["queries_per_request"] == 2
+    assert results["post"]["errors"] == 0
+    assert results["delete"]["requests"] == 5
+    assert Geolocation.objects.count() == 20
+
+
+@pytest.mark.django_db
+def test_run_benchmark_hedges_to_secondary() -> None:
+    seed_geolocations(20)
+
+    with FakeIPStackServer(error_rate=1.0) as primary, FakeIPStackServer() as secondary:
+        results = run_benchmark(
+            primary.url_template,
+            rows=20,
+            requests=5,
+            secondary_url_template=secondary.url_template,
+        )
+
+    # Every primary call fails, so the configured resolver fails over.
+    assert results["post"]["errors"] == 0
+
+
+@pytest.mark.parametrize("option", ["rows", "requests", "concurrency"])
+def test_benchmark_command_rejects_non_positive_counts(option: str) -> None:
+    with pytest.raises(CommandError):
+        call_command("benchmark", **{option: 0})
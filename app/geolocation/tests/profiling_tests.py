@@ -0,0 +1,120 @@
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+from django.db import OperationalError
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from geolocation.models import Geolocation
+from geolocation.profiling import REPORT_ID_HEADER, make_profile_token
+
+IPSTACK_DATA = {
+    "country_name": "Poland",
+    "region_name": "Mazovia",
+    "city": "Warsaw",
+    "latitude": 52.2297,
+    "longitude": 21.0122,
+}
+
+
+@pytest.fixture
+def api_client() -> APIClient:
+    return APIClient()
+
+
+@pytest.fixture
+def profiling_client() -> APIClient:
+    return APIClient(HTTP_X_GEOLOCATION_PROFILE=make_profile_token())
+
+
+def get_report(client: APIClient, report_id: str) -> dict:
+    response = client.get(
+        reverse("geolocation-profile", kwargs={"report_id": report_id})
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.data
+
+
+@pytest.mark.django_db
+def test_unprofiled_request_has_no_report(api_client: APIClient) -> None:
+    response = api_client.get(reverse("geolocation"), {"ip": "192.168.1.1"})
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert REPORT_ID_HEADER not in response
+
+
+@pytest.mark.django_db
+def test_invalid_profiling_token_is_ignored() -> None:
+    client = APIClient(HTTP_X_GEOLOCATION_PROFILE="forged")
+
+    response = client.get(reverse("geolocation"), {"ip": "192.168.1.1"})
+    report_response = client.get(
+        reverse("geolocation-profile", kwargs={"report_id": "any"})
+    )
+
+    assert REPORT_ID_HEADER not in response
+    assert report_response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_profiled_get_reports_sql(profiling_client: APIClient) -> None:
+    Geolocation.objects.create(
+        ip_address="192.168.1.1",
+        country="Poland",
+        region="Mazovia",
+        city="Warsaw",
+        latitude=52.2297,
+        longitude=21.0122,
+    )
+
+    response = profiling_client.get(
+        reverse("geolocation"), {"ip": "192.168.1.1"}
+    )
+    report = get_report(profiling_client, response[REPORT_ID_HEADER])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert report["status_code"] == status.HTTP_200_OK
+    # qs.exists() followed by the fetch.
+    assert report["sql"]["count"] == 2
+    assert "call_tree" in report["profile"]
+
+
+@pytest.mark.django_db
+def test_profiled_post_reports_upstream_call(
+    profiling_client: APIClient, requests_mock: any
+) -> None:
+    requests_mock.get(
+        f"https://api.ipstack.com/192.168.1.1?access_key={settings.IPSTACK_API_KEY}",
+        json=IPSTACK_DATA,
+    )
+
+    response = profiling_client.post(
+        reverse("geolocation"), {"ip": "192.168.1.1"}
+    )
+    report = get_report(profiling_client, response[REPORT_ID_HEADER])
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert [call["provider"] for call in report["upstream"]] == ["IPStack"]
+    assert report["upstream"][0]["error"] is None
+
+
+@pytest.mark.django_db
+def test_profiled_request_survives_report_store_failure(
+    profiling_client: APIClient,
+) -> None:
+    # Database down: both the view and the report store fail.
+    with patch(
+        "django.db.models.query.QuerySet.filter",
+        side_effect=OperationalError("Database is not available."),
+    ), patch(
+        "django.core.cache.backends.db.DatabaseCache.set",
+        side_effect=OperationalError("Database is not available."),
+    ):
+        response = profiling_client.get(
+            reverse("geolocation"), {"ip": "192.168.1.1"}
+        )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert REPORT_ID_HEADER not in response
@@ -0,0 +1,193 @@
+import ipaddress
+import time
+
+import pytest
+
+from geolocation.providers import (
+    BaseProvider,
+    HedgedResolver,
+    LocalDatasetProvider,
+    ProviderError,
+)
+
+WARSAW = {
+    "country": "Poland",
+    "region": "Mazovia",
+    "city": "Warsaw",
+    "latitude": 52.2297,
+    "longitude": 21.0122,
+}
+
+
+class FakeProvider(BaseProvider):
+    def __init__(
+        self, name: str, delay: float, p95_latency: float, fail: bool = False
+    ) -> None:
+        super().__init__(p95_latency=p95_latency)
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def fetch(self, query: str) -> dict:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ProviderError({"error": f"{self.name} API error"})
+        return {**WARSAW, "city": self.name}
+
+
+def test_resolver_fast_primary_does_not_hedge() -> None:
+    primary = FakeProvider("primary", delay=0, p95_latency=0.5)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.5)
+
+    result = HedgedResolver([primary, secondary]).resolve("192.168.1.1")
+
+    assert result["city"] == "primary"
+    assert secondary.calls == 0
+
+
+def test_resolver_hedges_slow_primary() -> None:
+    primary = FakeProvider("primary", delay=0.5, p95_latency=0.05)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.05)
+
+    started = time.perf_counter()
+    result = HedgedResolver([primary, secondary]).resolve("192.168.1.1")
+
+    assert result["city"] == "secondary"
+    assert time.perf_counter() - started < 0.5
+
+
+def test_resolver_fails_over_to_secondary() -> None:
+    primary = FakeProvider("primary", delay=0, p95_latency=0.5, fail=True)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.5)
+
+    result = HedgedResolver([primary, secondary]).resolve("192.168.1.1")
+
+    assert result["city"] == "secondary"
+
+
+def test_resolver_raises_primary_error_when_all_fail() -> None:
+    primary = FakeProvider("primary", delay=0, p95_latency=0.5, fail=True)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.5, fail=True)
+
+    with pytest.raises(ProviderError) as excinfo:
+        HedgedResolver([primary, secondary]).resolve("192.168.1.1")
+
+    assert excinfo.value.payload["error"] == "primary API error"
+
+
+def test_resolver_losing_calls_do_not_slow_later_requests() -> None:
+    primary = FakeProvider("primary", delay=1, p95_latency=0.02)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.02)
+    resolver = HedgedResolver([primary, secondary], max_hedge_ratio=1.0)
+
+    # More slow primaries than a small shared pool could hold at once.
+    for _ in range(12):
+        started = time.perf_counter()
+        result = resolver.resolve("192.168.1.1")
+
+        assert result["city"] == "secondary"
+        assert time.perf_counter() - started < 0.5
+
+
+def test_resolver_caps_hedge_rate() -> None:
+    primary = FakeProvider("primary", delay=0.1, p95_latency=0.01)
+    secondary = FakeProvider("secondary", delay=0, p95_latency=0.01)
+    resolver = HedgedResolver([primary, secondary], max_hedge_ratio=0.0)
+
+    results = [resolver.resolve("192.168.1.1")["city"] for _ in range(3)]
+
+    assert results == ["secondary", "primary", "primary"]
+    assert secondary.calls == 1
+
+
+class UnavailableProvider(BaseProvider):
+    name = "unavailable"
+
+    def fetch(self, query: str) -> dict:
+        raise OSError("/internal/path/networks.csv is unreadable")
+
+
+def test_resolver_unexpected_provider_error_hands_over() -> None:
+    primary = FakeProvider("primary", delay=0.1, p95_latency=0.01)
+    broken = UnavailableProvider(p95_latency=0.01)
+
+    result = HedgedResolver([primary, broken]).resolve("192.168.1.1")
+
+    assert result["city"] == "primary"
+
+
+def test_lookup_hides_expected_error_details() -> None:
+    with pytest.raises(ProviderError) as excinfo:
+        UnavailableProvider().lookup("192.168.1.1")
+
+    assert excinfo.value.payload == {"error": "unavailable provider error"}
+
+
+def test_lookup_propagates_programming_errors() -> None:
+    class BrokenProvider(BaseProvider):
+        def fetch(self, query: str) -> dict:
+            return {}["bug"]
+
+    with pytest.raises(KeyError):
+        BrokenProvider().lookup("192.168.1.1")
+
+
+def test_local_dataset_provider_most_specific_network(tmp_path: any) -> None:
+    dataset = tmp_path / "networks.csv"
+    dataset.write_text(
+        "network,country,region,city,latitude,longitude\n"
+        "192.168.0.0/16,Poland,Mazovia,Warsaw,52.2297,21.0122\n"
+        "192.168.1.0/24,Poland,Lesser Poland,Krakow,50.0647,19.945\n"
+    )
+    provider = LocalDatasetProvider(path=str(dataset))
+
+    assert provider.lookup("192.168.1.1")["city"] == "Krakow"
+    assert provider.lookup("192.168.2.1")["latitude"] == 52.2297
+    with pytest.raises(ProviderError):
+        provider.lookup("10.0.0.1")
+
+
+def test_local_dataset_provider_nested_networks(tmp_path: any) -> None:
+    dataset = tmp_path / "networks.csv"
+    dataset.write_text(
+        "network,country,region,city,latitude,longitude\n"
+        "10.0.0.0/8,Poland,Mazovia,Outer,0,0\n"
+        "10.1.0.0/16,Poland,Mazovia,Middle,0,0\n"
+        "10.1.1.0/24,Poland,Mazovia,Inner,0,0\n"
+        "2001:db8::/32,Poland,Mazovia,Six,0,0\n"
+    )
+    provider = LocalDatasetProvider(path=str(dataset))
+
+    assert provider.lookup("10.0.0.1")["city"] == "Outer"
+    assert provider.lookup("10.1.0.1")["city"] == "Middle"
+    assert provider.lookup("10.1.1.1")["city"] == "Inner"
+    assert provider.lookup("10.1.2.1")["city"] == "Middle"
+    assert provider.lookup("10.2.0.1")["city"] == "Outer"
+    assert provider.lookup("2001:db8::1")["city"] == "Six"
+    with pytest.raises(ProviderError):
+        provider.lookup("11.0.0.1")
+
+
+def test_local_dataset_provider_large_dataset_lookups_are_fast(
+    tmp_path: any,
+) -> None:
+    dataset = tmp_path / "networks.csv"
+    lines = ["network,country,region,city,latitude,longitude"]
+    lines += [
+        f"{ipaddress.IPv4Address(index << 8)}/24,Poland,Mazovia,City {index},0,0"
+        for index in range(1 << 16, (1 << 16) + 50_000)
+    ]
+    dataset.write_text("\n".join(lines) + "\n")
+    provider = LocalDatasetProvider(path=str(dataset))
+    last = (1 << 16) + 49_999
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        result = provider.lookup(str(ipaddress.IPv4Address((last << 8) + 1)))
+    elapsed = time.perf_counter() - started
+
+    assert result["city"] == f"City {last}"
+    # A linear scan takes tens of milliseconds per lookup at this size.
+    assert elapsed < 0.5
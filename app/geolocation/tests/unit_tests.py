@@ -2,10 +2,11 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from django.db import OperationalError
-from django.test import RequestFactory
+from django.test import RequestFactory, override_settings
 from rest_framework import status
 
 from geolocation.models import Geolocation
+from geolocation.providers import get_resolver
 from geolocation.views import GeolocationView
 
 GEOLOCATION_URL = "/geolocation/"
@@ -97,6 +98,50 @@ def test_post_geolocation(request_factory: RequestFactory) -> None:
         assert response.data["city"] == "Warsaw"
 
 
+@pytest.mark.django_db
+def test_post_geolocation_missing_ipstack_key(
+    request_factory: RequestFactory,
+) -> None:
+    with override_settings(IPSTACK_API_KEY=None):
+        get_resolver.cache_clear()
+        try:
+            request = request_factory.post(GEOLOCATION_URL, {"ip": "192.168.1.1"})
+            response = GeolocationView.as_view()(request)
+        finally:
+            get_resolver.cache_clear()
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.data["error"] == "Missing IPStack API key in settings."
+
+
+@pytest.mark.django_db
+def test_post_geolocation_without_ipstack_key(
+    request_factory: RequestFactory, tmp_path: any
+) -> None:
+    dataset = tmp_path / "networks.csv"
+    dataset.write_text(
+        "network,country,region,city,latitude,longitude\n"
+        "192.168.0.0/16,Poland,Mazovia,Warsaw,52.2297,21.0122\n"
+    )
+    providers = [
+        {
+            "BACKEND": "geolocation.providers.LocalDatasetProvider",
+            "OPTIONS": {"path": str(dataset)},
+        }
+    ]
+
+    with override_settings(IPSTACK_API_KEY=None, GEOLOCATION_PROVIDERS=providers):
+        get_resolver.cache_clear()
+        try:
+            request = request_factory.post(GEOLOCATION_URL, {"ip": "192.168.1.1"})
+            response = GeolocationView.as_view()(request)
+        finally:
+            get_resolver.cache_clear()
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.data["city"] == "Warsaw"
+
+
 @pytest.mark.django_db
 def test_delete_geolocation(request_factory: RequestFactory) -> None:
     Geolocation.objects.create(
@@ -168,6 +213,24 @@ def test_post_geolocation_invalid_ipstack_data(
         assert response.data["error"] == "Invalid data from IPStack API"
 
 
+@pytest.mark.django_db
+def test_post_geolocation_non_object_ipstack_data(
+    request_factory: RequestFactory,
+) -> None:
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = ["not", "an", "object"]
+
+    with patch(REQUESTS_GET, return_value=mock_response):
+        request = request_factory.post(GEOLOCATION_URL, {"ip": "192.168.1.1"})
+        view = GeolocationView.as_view()
+
+        response = view(request)
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+        assert response.data["error"] == "Invalid data from IPStack API"
+
+
 @pytest.mark.django_db
 def test_get_geolocation_database_unavailable(
     request_factory: RequestFactory,
@@ -1,7 +1,12 @@
 from django.urls import path
 
-from .views import GeolocationView
+from .views import GeolocationView, ProfileReportView
 
 urlpatterns = [
     path("geolocation/", GeolocationView.as_view(), name="geolocation"),
+    path(
+        "geolocation/profiles/<str:report_id>/",
+        ProfileReportView.as_view(),
+        name="geolocation-profile",
+    ),
 ]
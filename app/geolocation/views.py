@@ -1,16 +1,17 @@
 from functools import wraps
 from typing import Optional, Tuple
 
-import requests
-from django.conf import settings
 from django.db import DatabaseError, OperationalError
 from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Geolocation
+from .profiling import get_report, is_profiling_authorized, profile_request
+from .providers import ProviderConfigurationError, ProviderError, get_resolver
 from .serializers import GeolocationInputSerializer, GeolocationSerializer
 
 
@@ -37,6 +38,10 @@ class GeolocationView(APIView):
     API endpoint to retrieve, store, and delete geolocation data for IP addresses and URLs.
     """
 
+    @profile_request
+    def dispatch(self, request: HttpRequest, *args: tuple, **kwargs: dict) -> HttpResponse:
+        return super().dispatch(request, *args, **kwargs)
+
     @handle_db_error
     def get(self, request: Request) -> Response:
         """
@@ -63,29 +68,19 @@ class GeolocationView(APIView):
         Retrieve and store geolocation data for the given IP or URL.
         """
 
-        if not settings.IPSTACK_API_KEY:
-            return Response(
-                {"error": "Missing IPStack API key in settings."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
-
         input_serializer = GeolocationInputSerializer(data=request.data)
         input_serializer.is_valid(raise_exception=True)
         ip = input_serializer.validated_data.get("ip")
         url = input_serializer.validated_data.get("url")
 
-        geolocation_data = self._get_geolocation_data_from_ipstack(ip, url)
+        geolocation_data = self._get_geolocation_data(ip, url)
         if isinstance(geolocation_data, Response):
             return geolocation_data
 
         geolocation = Geolocation.objects.create(
             ip_address=ip or None,
             url=url or None,
-            country=geolocation_data.get("country_name", ""),
-            region=geolocation_data.get("region_name", ""),
-            city=geolocation_data.get("city", ""),
-            latitude=geolocation_data.get("latitude", 0),
-            longitude=geolocation_data.get("longitude", 0),
+            **geolocation_data,
         )
         serializer = GeolocationSerializer(geolocation)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -120,54 +115,41 @@ class GeolocationView(APIView):
             return Geolocation.objects.filter(ip_address=ip)
         return Geolocation.objects.filter(url=url)
 
-    def _get_geolocation_data_from_ipstack(
+    def _get_geolocation_data(
         self, ip: Optional[str], url: Optional[str]
     ) -> dict | Response:
         """
-        Helper function to retrieve geolocation data from the IPStack API.
+        Helper function to retrieve geolocation data from the configured providers.
         """
-        ipstack_url = f"https://api.ipstack.com/{ip or url}?access_key={settings.IPSTACK_API_KEY}"
-        response = requests.get(ipstack_url, timeout=5)
-
-        if response.status_code != 200:
-            return Response(
-                {
-                    "error": "IPStack API error",
-                    "status_code": response.status_code,
-                    "details": response.text,
-                },
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
-
         try:
-            data = response.json()
-        except ValueError:
+            return get_resolver().resolve(ip or url)
+        except ProviderConfigurationError as e:
             return Response(
-                {"error": "Invalid JSON response from IPStack API"},
-                status=status.HTTP_502_BAD_GATEWAY,
+                e.payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        except ProviderError as e:
+            return Response(e.payload, status=status.HTTP_502_BAD_GATEWAY)
 
-        if not data.get("success", True):
-            return Response(
-                {
-                    "error": "IPStack API returned an error",
-                    "details": data.get("error", {}).get("info", "Unknown error"),
-                },
-                status=status.HTTP_502_BAD_GATEWAY,
-            )
 
-        required_keys = [
-            "country_name",
-            "region_name",
-            "city",
-            "latitude",
-            "longitude",
-        ]
+class ProfileReportView(APIView):
+    """
+    API endpoint to retrieve a stored profiling report of a geolocation request.
+    """
 
-        if not all(key in data for key in required_keys):
+    def get(self, request: Request, report_id: str) -> Response:
+        """
+        Retrieve the report; requires the same signed header as profiling.
+        """
+        if not is_profiling_authorized(request):
             return Response(
-                {"error": "Invalid data from IPStack API"},
-                status=status.HTTP_502_BAD_GATEWAY,
+                {"error": "Invalid or missing profiling token."},
+                status=status.HTTP_403_FORBIDDEN,
             )
 
-        return data
\ No newline at end of file
+        report = get_report(report_id)
+        if report is None:
+            return Response(
+                {"error": "Profiling report not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(report, status=status.HTTP_200_OK)
@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+wsgi_app = "config.wsgi:application"
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(
+    os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1)
+)
+
+# Import the application once in the master process so forked workers
+# start serving immediately and share its memory copy-on-write.
+preload_app = True
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings_api")
+
@@ -9,6 +9,7 @@ echo "Database is ready!"
 
 echo "Running migrations..."
 python manage.py migrate
+python manage.py createcachetable
 echo "Migrations completed."
 
 # Running Django server